@@ -0,0 +1,24 @@
+"""
+Shared pytest fixtures for the sensor and simulation test suites
+"""
+
+import pytest
+from sensors import RoomSensors, DailyProfile
+from simulation import SmartHomeSimulation
+
+
+@pytest.fixture(scope='session')
+def daily_readings():
+    """Read every sensor of one room across a full day in a single batch."""
+    room = RoomSensors("FixtureRoom", base_temp=20.0)
+    return room.read_series(DailyProfile(tuple(float(h) for h in range(24))))
+
+
+@pytest.fixture(scope='session')
+def sim_results():
+    """
+    Run the full simulation once per test session and share it between the
+    tests that only inspect it (once per worker under pytest-xdist).
+    """
+    sim = SmartHomeSimulation()
+    return sim, sim.run_simulation(verbose=False)
@@ -6,7 +6,7 @@ Implements Observer pattern for sensor notifications and multiple sensor types
 import math
 import random
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Optional, Tuple
 from datetime import datetime, timedelta
 
 
@@ -17,22 +17,42 @@ class SensorSubject:
     """
     
     def __init__(self):
-        self._observers: List['SensorObserver'] = []
+        # Keyed by id() for O(1) (un)registration; dicts keep insertion
+        # order, so observers are still notified in registration order
+        self._observers: Dict[int, 'SensorObserver'] = {}
+        # Immutable snapshot to notify, rebuilt only when registrations change,
+        # so an observer can (un)register others while being notified
+        self._notify_order: Tuple['SensorObserver', ...] = ()
     
     def register_observer(self, observer: 'SensorObserver') -> None:
         """Register an observer to be notified of sensor changes."""
-        if observer not in self._observers:
-            self._observers.append(observer)
+        self._observers.setdefault(id(observer), observer)
+        self._notify_order = tuple(self._observers.values())
     
     def unregister_observer(self, observer: 'SensorObserver') -> None:
         """Unregister an observer."""
-        if observer in self._observers:
-            self._observers.remove(observer)
+        self._observers.pop(id(observer), None)
+        self._notify_order = tuple(self._observers.values())
     
     def notify_observers(self, sensor_data: Dict[str, Any]) -> None:
-        """Notify all registered observers of sensor data."""
-        for observer in self._observers:
-            observer.update(sensor_data)
+        """
+        Notify all registered observers of sensor data.
+        Each observer gets its own dict; the original goes to the last one,
+        so earlier observers can't alter what later ones receive.
+        """
+        observers = self._notify_order
+        for observer in observers[:-1]:
+            observer.update(sensor_data.copy())
+        if observers:
+            observers[-1].update(sensor_data)
+    
+    def notify_observers_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Notify all registered observers of several sensor readings at once (see notify_observers)."""
+        observers = self._notify_order
+        for observer in observers[:-1]:
+            observer.update_batch([sensor_data.copy() for sensor_data in batch])
+        if observers:
+            observers[-1].update_batch(batch)
 
 
 class SensorObserver(ABC):
@@ -41,6 +61,8 @@ class SensorObserver(ABC):
     Other modules (e.g., control logic, logging) will implement this.
     """
     
+    __slots__ = ()  # lets subclasses that declare __slots__ drop the instance dict
+    
     @abstractmethod
     def update(self, sensor_data: Dict[str, Any]) -> None:
         """
@@ -50,6 +72,65 @@ class SensorObserver(ABC):
             sensor_data: Dictionary containing sensor readings and metadata
         """
         pass
+    
+    def update_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Called with several sensor readings at once, in the order they were taken.
+        Defaults to calling update() for each reading; override for a cheaper bulk path.
+        
+        Args:
+            batch: List of sensor_data dictionaries
+        """
+        for sensor_data in batch:
+            self.update(sensor_data)
+
+
+def _occupancy_probability(simulated_hour: float) -> float:
+    """
+    Get occupancy probability based on time of day.
+    
+    Args:
+        simulated_hour: Hour of day (0-24)
+    
+    Returns:
+        Probability of occupancy (0.0-1.0)
+    """
+    if 22 <= simulated_hour or simulated_hour < 6:  # 10PM-6AM
+        return 0.10
+    elif 6 <= simulated_hour < 17:  # 6AM-5PM (work hours)
+        return 0.20
+    else:  # 5PM-10PM (evening)
+        return 0.80
+
+
+class DailyProfile:
+    """
+    Time-of-day terms for a fixed sequence of simulated hours.
+    Every room sees the same clock, so the trig curves and occupancy schedule
+    are computed once here and shared by all sensors reading the same hours.
+    """
+    
+    def __init__(self, simulated_hours: Sequence[float]):
+        """
+        Precompute per-hour lookup tables.
+        
+        Args:
+            simulated_hours: Hours of day (0-24) in simulated time
+        """
+        self.hours = tuple(simulated_hours)
+        sin, cos, pi = math.sin, math.cos, math.pi
+        # Temperature sine wave peaks at 14 (2PM), minimum at 2 (2AM)
+        self.temperature_wave = tuple(sin((h - 14) * pi / 12) for h in self.hours)
+        # Daylight cosine peaks at 12 (noon), is 0 at 6 and 18
+        self.daylight_wave = tuple(cos((h - 12) * pi / 6) for h in self.hours)
+        self.is_daylight = tuple(6 <= h <= 18 for h in self.hours)
+        self.occupancy_probability = tuple(
+            _occupancy_probability(h) for h in self.hours
+        )
+    
+    def __len__(self) -> int:
+        """Number of hours covered by this profile."""
+        return len(self.hours)
 
 
 class TemperatureSensor(SensorSubject):
@@ -60,23 +141,32 @@ class TemperatureSensor(SensorSubject):
     Range: 15–45°C
     """
     
-    def __init__(self, base_temp: float = 20.0, room_name: str = "Unknown"):
+    UNIT = '°C'
+    
+    def __init__(self, base_temp: float = 20.0, room_name: str = "Unknown",
+                 rng: Optional[random.Random] = None):
         """
         Initialize temperature sensor.
         
         Args:
             base_temp: Base temperature for the room (default 20°C)
             room_name: Name of the room this sensor is in
+            rng: Random generator for noise (default: the global random module)
         """
         super().__init__()
         self.base_temp = base_temp
         self.room_name = room_name
+        self._rng = rng if rng is not None else random
         self.min_temp = 15.0
         self.max_temp = 45.0
         self._ac_on = False
         self._ac_cooling_offset = 0.0
         self._ac_cooling_rate = 0.3  # °C decrease per reading while AC is on
         self._ac_max_cooling = 6.0   # maximum cooling effect in °C
+        # Fields shared by every reading; each payload starts as a copy of this
+        self._payload_template = {'sensor_type': 'temperature', 'room': room_name, 'unit': self.UNIT}
+        # Formula: base_temp + amplitude * sin((hour - 14) * π / 12)
+        self.amplitude = 5.0
     
     def read(self, simulated_hour: float) -> float:
         """
@@ -89,45 +179,91 @@ class TemperatureSensor(SensorSubject):
             Temperature in Celsius
         """
         # Sine wave peaks at 14 (2PM), minimum at 2 (2AM)
-        # Formula: base_temp + amplitude * sin((hour - 14) * π / 12)
-        amplitude = 5.0
+        return self._read_one(math.sin((simulated_hour - 14) * math.pi / 12), simulated_hour)
+    
+    def read_step(self, profile: DailyProfile, index: int) -> float:
+        """
+        Generate one temperature reading for an hour of a precomputed profile.
+        Same as read(profile.hours[index]), reusing the profile's sine term.
         
-        # Calculate sine component (peaks at 14:00)
-        sine_component = amplitude * math.sin((simulated_hour - 14) * math.pi / 12)
+        Args:
+            profile: Precomputed time-of-day terms
+            index: Position of the hour to read within the profile
         
-        # Add base temperature offset
-        temp = self.base_temp + sine_component
+        Returns:
+            Temperature in Celsius
+        """
+        return self._read_one(profile.temperature_wave[index], profile.hours[index])
+    
+    def _read_one(self, wave: float, simulated_hour: float,
+                  batch: Optional[List[Dict[str, Any]]] = None) -> float:
+        """
+        Generate one reading from its sine term.
+        Observers are notified right away, unless a batch is given to collect
+        the payload in for the caller to deliver with the rest of a series.
+        """
+        # Base temperature plus the scaled sine wave (peaks at 14:00)
+        temp = self.base_temp + self.amplitude * wave
         
-        # Apply AC cooling effect
+        # Apply AC cooling effect (plain comparisons instead of min()/max()
+        # calls keep this per-reading path cheap)
+        offset = self._ac_cooling_offset
         if self._ac_on:
-            self._ac_cooling_offset = min(
-                self._ac_cooling_offset + self._ac_cooling_rate,
-                self._ac_max_cooling
-            )
-        else:
+            offset += self._ac_cooling_rate
+            if offset > self._ac_max_cooling:
+                offset = self._ac_max_cooling
+        elif offset:
             # Gradually recover when AC is off
-            self._ac_cooling_offset = max(self._ac_cooling_offset - 0.2, 0.0)
-        temp -= self._ac_cooling_offset
+            offset -= 0.2
+            if offset < 0.0:
+                offset = 0.0
+        self._ac_cooling_offset = offset
+        temp -= offset
         
-        # Add random noise (±0.5°C)
-        noise = random.uniform(-0.5, 0.5)
-        temp += noise
+        # Add random noise (±0.5°C), then clamp to valid range
+        temp += self._rng.uniform(-0.5, 0.5)
+        if temp < self.min_temp:
+            temp = self.min_temp
+        elif temp > self.max_temp:
+            temp = self.max_temp
+        temp = round(temp, 2)
         
-        # Clamp to valid range
-        temp = max(self.min_temp, min(self.max_temp, temp))
+        if self._observers:
+            payload = self._payload_template.copy()
+            payload['value'] = temp
+            payload['hour'] = simulated_hour
+            if batch is None:
+                self.notify_observers(payload)
+            else:
+                batch.append(payload)
         
-        # Notify observers
-        sensor_data = {
-            'sensor_type': 'temperature',
-            'room': self.room_name,
-            'value': round(temp, 2),
-            'unit': '°C',
-            'hour': simulated_hour
-        }
-        self.notify_observers(sensor_data)
+        return temp
+    
+    def read_series(self, profile: DailyProfile) -> List[float]:
+        """
+        Generate temperature readings for a sequence of hours in one pass.
+        Equivalent to calling read() once per hour, except that observers are
+        notified once with the whole batch after the series is generated, so
+        an AC change an observer makes in response only applies from the next
+        call. Use read_step() where control logic must react between readings.
         
-        return round(temp, 2)
-
+        Args:
+            profile: Precomputed time-of-day terms for the hours to read
+        
+        Returns:
+            List of temperatures in Celsius, one per hour
+        """
+        batch = []
+        read_one = self._read_one
+        temperatures = [read_one(wave, simulated_hour, batch)
+                        for simulated_hour, wave in zip(profile.hours, profile.temperature_wave)]
+        
+        # Notify observers once for the whole series
+        if batch:
+            self.notify_observers_batch(batch)
+        
+        return temperatures
+    
     def set_ac_state(self, on: bool) -> None:
         """
         Set the AC state for this sensor's room.
@@ -153,72 +289,100 @@ class PIRSensor(SensorSubject):
     before re-evaluating occupancy probability.
     """
     
-    def __init__(self, room_name: str = "Unknown"):
+    def __init__(self, room_name: str = "Unknown", rng: Optional[random.Random] = None):
         """
         Initialize PIR sensor.
         
         Args:
             room_name: Name of the room this sensor is in
+            rng: Random generator for occupancy (default: the global random module)
         """
         super().__init__()
         self.room_name = room_name
+        self._rng = rng if rng is not None else random
         self.is_occupied = False
         self.readings_until_reevaluate = 0
+        # Fields shared by every reading; each payload starts as a copy of this
+        self._payload_template = {'sensor_type': 'pir', 'room': room_name}
     
-    def _get_occupancy_probability(self, simulated_hour: float) -> float:
+    def read(self, simulated_hour: float) -> int:
         """
-        Get occupancy probability based on time of day.
+        Generate a motion sensor reading.
         
         Args:
-            simulated_hour: Hour of day (0-24)
+            simulated_hour: Hour of day (0-24) in simulated time
         
         Returns:
-            Probability of occupancy (0.0-1.0)
+            1 if occupied, 0 if empty
         """
-        if 22 <= simulated_hour or simulated_hour < 6:  # 10PM-6AM
-            return 0.10
-        elif 6 <= simulated_hour < 17:  # 6AM-5PM (work hours)
-            return 0.20
-        else:  # 5PM-10PM (evening)
-            return 0.80
+        return self._read_one(_occupancy_probability(simulated_hour), simulated_hour)
     
-    def read(self, simulated_hour: float) -> int:
+    def read_step(self, profile: DailyProfile, index: int) -> int:
         """
-        Generate a motion sensor reading.
+        Generate one motion sensor reading for an hour of a precomputed profile.
+        Same as read(profile.hours[index]), reusing the profile's occupancy schedule.
         
         Args:
-            simulated_hour: Hour of day (0-24) in simulated time
+            profile: Precomputed time-of-day terms
+            index: Position of the hour to read within the profile
         
         Returns:
             1 if occupied, 0 if empty
         """
+        return self._read_one(profile.occupancy_probability[index], profile.hours[index])
+    
+    def _read_one(self, probability: float, simulated_hour: float,
+                  batch: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Advance the hold-period state machine once.
+        Observers are notified right away, unless a batch is given to collect
+        the payload in (see TemperatureSensor._read_one).
+        """
         # If we need to re-evaluate occupancy
         if self.readings_until_reevaluate <= 0:
-            probability = self._get_occupancy_probability(simulated_hour)
-            self.is_occupied = random.random() < probability
-            
-            # If occupied, stay occupied for 2-8 readings (10-40 minutes)
-            if self.is_occupied:
-                self.readings_until_reevaluate = random.randint(2, 8)
-            else:
-                # If empty, re-evaluate next reading
-                self.readings_until_reevaluate = 1
+            self.is_occupied = self._rng.random() < probability
+            # If occupied, stay occupied for 2-8 readings (10-40 minutes);
+            # if empty, re-evaluate next reading
+            self.readings_until_reevaluate = self._rng.randint(2, 8) if self.is_occupied else 1
         else:
             self.readings_until_reevaluate -= 1
         
         occupancy = 1 if self.is_occupied else 0
         
-        # Notify observers
-        sensor_data = {
-            'sensor_type': 'pir',
-            'room': self.room_name,
-            'value': occupancy,
-            'occupied': self.is_occupied,
-            'hour': simulated_hour
-        }
-        self.notify_observers(sensor_data)
+        if self._observers:
+            payload = self._payload_template.copy()
+            payload['value'] = occupancy
+            payload['occupied'] = self.is_occupied
+            payload['hour'] = simulated_hour
+            if batch is None:
+                self.notify_observers(payload)
+            else:
+                batch.append(payload)
         
         return occupancy
+    
+    def read_series(self, profile: DailyProfile) -> List[int]:
+        """
+        Generate motion sensor readings for a sequence of hours in one pass.
+        Equivalent to calling read() once per hour, except that observers are
+        notified once with the whole batch after the series is generated.
+        
+        Args:
+            profile: Precomputed time-of-day terms for the hours to read
+        
+        Returns:
+            List of occupancy values (1 if occupied, 0 if empty), one per hour
+        """
+        batch = []
+        read_one = self._read_one
+        occupancies = [read_one(probability, simulated_hour, batch)
+                       for simulated_hour, probability in zip(profile.hours, profile.occupancy_probability)]
+        
+        # Notify observers once for the whole series
+        if batch:
+            self.notify_observers_batch(batch)
+        
+        return occupancies
 
 
 class LDRSensor(SensorSubject):
@@ -232,17 +396,23 @@ class LDRSensor(SensorSubject):
     Adds realistic noise.
     """
     
-    def __init__(self, room_name: str = "Unknown"):
+    UNIT = '0-1023'
+    
+    def __init__(self, room_name: str = "Unknown", rng: Optional[random.Random] = None):
         """
         Initialize LDR sensor.
         
         Args:
             room_name: Name of the room this sensor is in
+            rng: Random generator for noise (default: the global random module)
         """
         super().__init__()
         self.room_name = room_name
+        self._rng = rng if rng is not None else random
         self.min_brightness = 0
         self.max_brightness = 1023
+        # Fields shared by every reading; each payload starts as a copy of this
+        self._payload_template = {'sensor_type': 'ldr', 'room': room_name, 'unit': self.UNIT}
     
     def read(self, simulated_hour: float) -> int:
         """
@@ -254,40 +424,82 @@ class LDRSensor(SensorSubject):
         Returns:
             Light level (0-1023)
         """
-        # Daylight curve: peaks at 12 (noon), dark before 6AM and after 6PM
-        # Using cosine for smooth curve
+        # Cosine peaks at 12 (noon), is 0 at 6 and 18; only needed in daylight
+        is_daylight = 6 <= simulated_hour <= 18
+        cosine_component = math.cos((simulated_hour - 12) * math.pi / 6) if is_daylight else 0.0
+        return self._read_one(is_daylight, cosine_component, simulated_hour)
+    
+    def read_step(self, profile: DailyProfile, index: int) -> int:
+        """
+        Generate one light level reading for an hour of a precomputed profile.
+        Same as read(profile.hours[index]), reusing the profile's daylight terms.
+        
+        Args:
+            profile: Precomputed time-of-day terms
+            index: Position of the hour to read within the profile
         
-        if simulated_hour < 6 or simulated_hour > 18:
+        Returns:
+            Light level (0-1023)
+        """
+        return self._read_one(profile.is_daylight[index], profile.daylight_wave[index],
+                              profile.hours[index])
+    
+    def _read_one(self, is_daylight: bool, cosine_component: float, simulated_hour: float,
+                  batch: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Generate one reading from its daylight terms.
+        Observers are notified right away, unless a batch is given to collect
+        the payload in (see TemperatureSensor._read_one).
+        """
+        if not is_daylight:
             # Dark period (before 6AM or after 6PM)
-            brightness = self.min_brightness + random.uniform(-10, 10)
-        elif 6 <= simulated_hour <= 18:
-            # Daylight period
-            # Cosine peaks at 12, is 0 at 6 and 18
-            cosine_component = math.cos((simulated_hour - 12) * math.pi / 6)
-            # Map from [-1, 1] to [0, 1023]
-            brightness = (cosine_component + 1) / 2 * self.max_brightness
-            
-            # Add noise
-            noise = random.uniform(-30, 30)
-            brightness += noise
+            brightness = self.min_brightness + self._rng.uniform(-10, 10)
         else:
-            brightness = self.min_brightness
+            # Map the daylight cosine from [-1, 1] to [0, 1023], then add noise
+            brightness = (cosine_component + 1) / 2 * self.max_brightness
+            brightness += self._rng.uniform(-30, 30)
         
         # Clamp to valid range
-        brightness = max(self.min_brightness, min(self.max_brightness, brightness))
+        if brightness < self.min_brightness:
+            brightness = self.min_brightness
+        elif brightness > self.max_brightness:
+            brightness = self.max_brightness
         brightness = int(brightness)
         
-        # Notify observers
-        sensor_data = {
-            'sensor_type': 'ldr',
-            'room': self.room_name,
-            'value': brightness,
-            'unit': '0-1023',
-            'hour': simulated_hour
-        }
-        self.notify_observers(sensor_data)
+        if self._observers:
+            payload = self._payload_template.copy()
+            payload['value'] = brightness
+            payload['hour'] = simulated_hour
+            if batch is None:
+                self.notify_observers(payload)
+            else:
+                batch.append(payload)
         
         return brightness
+    
+    def read_series(self, profile: DailyProfile) -> List[int]:
+        """
+        Generate light level readings for a sequence of hours in one pass.
+        Equivalent to calling read() once per hour, except that observers are
+        notified once with the whole batch after the series is generated.
+        
+        Args:
+            profile: Precomputed time-of-day terms for the hours to read
+        
+        Returns:
+            List of light levels (0-1023), one per hour
+        """
+        batch = []
+        read_one = self._read_one
+        levels = [read_one(is_daylight, cosine_component, simulated_hour, batch)
+                  for simulated_hour, is_daylight, cosine_component in zip(
+                      profile.hours, profile.is_daylight, profile.daylight_wave)]
+        
+        # Notify observers once for the whole series
+        if batch:
+            self.notify_observers_batch(batch)
+        
+        return levels
 
 
 class RoomSensors:
@@ -296,18 +508,21 @@ class RoomSensors:
     Provides a unified interface to read all sensors at once.
     """
     
-    def __init__(self, room_name: str, base_temp: float = 20.0):
+    def __init__(self, room_name: str, base_temp: float = 20.0,
+                 rng: Optional[random.Random] = None):
         """
         Initialize all sensors for a room.
         
         Args:
             room_name: Name of the room
             base_temp: Base temperature for the room
+            rng: Random generator shared by the room's sensors
+                 (default: the global random module)
         """
         self.room_name = room_name
-        self.temperature_sensor = TemperatureSensor(base_temp, room_name)
-        self.pir_sensor = PIRSensor(room_name)
-        self.ldr_sensor = LDRSensor(room_name)
+        self.temperature_sensor = TemperatureSensor(base_temp, room_name, rng)
+        self.pir_sensor = PIRSensor(room_name, rng)
+        self.ldr_sensor = LDRSensor(room_name, rng)
     
     def register_observer(self, observer: SensorObserver) -> None:
         """
@@ -338,3 +553,58 @@ class RoomSensors:
             'light_level': self.ldr_sensor.read(simulated_hour)
         }
         return readings
+    
+    def read_step(self, profile: DailyProfile, index: int) -> Dict[str, Any]:
+        """
+        Read all sensors for this room at one hour of a precomputed profile.
+        Each sensor notifies its observers before the next one is read.
+        
+        Args:
+            profile: Precomputed time-of-day terms
+            index: Position of the hour to read within the profile
+        
+        Returns:
+            Dictionary with all sensor readings (see read_all)
+        """
+        readings = {
+            'room': self.room_name,
+            'hour': profile.hours[index],
+            'temperature': self.temperature_sensor.read_step(profile, index),
+            'occupancy': self.pir_sensor.read_step(profile, index),
+            'light_level': self.ldr_sensor.read_step(profile, index)
+        }
+        return readings
+    
+    def read_all_batch(self, hours: Sequence[float]) -> Dict[str, Any]:
+        """
+        Read all sensors for this room at each of the given hours in one batch.
+        
+        Args:
+            hours: Hours of day (0-24) in simulated time
+        
+        Returns:
+            Dictionary with one list of readings per sensor (see read_series)
+        """
+        return self.read_series(DailyProfile(hours))
+    
+    def read_series(self, profile: DailyProfile) -> Dict[str, Any]:
+        """
+        Read all sensors for this room across a sequence of hours.
+        Each sensor generates its whole series in one pass, so observers
+        receive this room's readings grouped by sensor rather than by hour,
+        and only after the whole series has been read.
+        
+        Args:
+            profile: Precomputed time-of-day terms for the hours to read
+        
+        Returns:
+            Dictionary with one list of readings per sensor
+        """
+        readings = {
+            'room': self.room_name,
+            'hours': list(profile.hours),
+            'temperature': self.temperature_sensor.read_series(profile),
+            'occupancy': self.pir_sensor.read_series(profile),
+            'light_level': self.ldr_sensor.read_series(profile)
+        }
+        return readings
@@ -4,31 +4,125 @@ Runs 288 steps (5-minute intervals) with 4 rooms, reading all sensors and loggin
 """
 
 import json
+import random
+import sys
+from array import array
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
-from sensors import RoomSensors, SensorObserver
+from typing import Dict, List, Any, Optional, Sequence
+from sensors import DailyProfile, RoomSensors, SensorObserver, TemperatureSensor, LDRSensor
+
+try:
+    import orjson  # optional: much faster JSON export when installed
+except ImportError:
+    orjson = None
+
+
+# Compact record of one logged reading, built from its payload on first access
+Reading = namedtuple('Reading', 'sensor_type room value hour')
+
+# Fields dropped from the logged Reading, restored on export
+_UNITS = {'temperature': TemperatureSensor.UNIT, 'ldr': LDRSensor.UNIT}
+
+
+class _ValueBuckets(dict):
+    """
+    Per-room value storage: one compact typed array per sensor type.
+    Arrays hold raw machine values instead of boxed Python objects, so
+    min/max/sum over them run as a single pass over contiguous memory.
+    """
+    
+    # array typecodes per sensor type (°C floats, 0/1 flags, 0-1023 levels)
+    TYPECODES = {'temperature': 'd', 'pir': 'b', 'ldr': 'h'}
+    
+    def __missing__(self, sensor_type: str) -> array:
+        bucket = array(self.TYPECODES.get(sensor_type, 'd'))
+        self[sensor_type] = bucket
+        return bucket
 
 
 class SimulationLogger(SensorObserver):
     """
     Logs all sensor readings during simulation.
     Implements SensorObserver to receive notifications from sensors.
+    
+    For long runs the raw reading list can be subsampled with sample_p:
+    only about that fraction of readings is kept for get_readings() and
+    export, while the per-room values used for statistics stay complete.
+    Only the raw list shrinks: by_room still holds every value, as one
+    compact array entry (1-8 bytes) per reading, so memory stays O(N).
     """
     
-    def __init__(self):
-        self.readings: List[Dict[str, Any]] = []
+    def __init__(self, sample_p: float = 1.0):
+        """
+        Initialize the logger.
+        
+        Args:
+            sample_p: Fraction of raw readings to keep (0 < sample_p <= 1)
+        """
+        if not 0.0 < sample_p <= 1.0:
+            raise ValueError(f"sample_p must be in (0, 1], got {sample_p}")
+        self.sample_p = sample_p
+        self._sample_acc = 0.0
+        # Raw readings are kept only for get_readings() and raw export;
+        # analysis uses by_room. Payloads are held as received and turned
+        # into Readings only when asked for, off the simulation's hot path.
+        self._payloads: List[Dict[str, Any]] = []
+        self._readings: List[Reading] = []
+        # Keeping every reading needs no sampling work at all
+        self._keep = self._payloads.append if sample_p == 1.0 else self._keep_sampled
+        # Values bucketed by room and sensor type as they arrive,
+        # so analysis reads them directly instead of rescanning every reading
+        self.by_room: Dict[str, Dict[str, array]] = defaultdict(_ValueBuckets)
     
     def update(self, sensor_data: Dict[str, Any]) -> None:
         """Log sensor data when notified."""
-        self.readings.append(sensor_data)
+        self.by_room[sensor_data['room']][sensor_data['sensor_type']].append(sensor_data['value'])
+        self._keep(sensor_data)
     
-    def get_readings(self) -> List[Dict[str, Any]]:
+    def _keep_sampled(self, sensor_data: Dict[str, Any]) -> None:
+        """Keep a reading each time the sampling accumulator crosses 1."""
+        self._sample_acc += self.sample_p
+        if self._sample_acc >= 1.0:
+            self._sample_acc -= 1.0
+            self._payloads.append(sensor_data)
+    
+    @property
+    def reading_count(self) -> int:
+        """Number of readings received, whether or not they were kept."""
+        return sum(len(bucket) for buckets in self.by_room.values() for bucket in buckets.values())
+    
+    @property
+    def readings(self) -> List[Reading]:
+        """Logged readings, converting any payloads received since the last access."""
+        if self._payloads:
+            self._readings.extend(
+                Reading(p['sensor_type'], p['room'], p['value'], p['hour']) for p in self._payloads
+            )
+            self._payloads.clear()
+        return self._readings
+    
+    def get_readings(self) -> List[Reading]:
         """Get all logged readings."""
         return self.readings
     
-    def get_readings_for_room(self, room_name: str) -> List[Dict[str, Any]]:
+    def get_readings_for_room(self, room_name: str) -> List[Reading]:
         """Get all readings for a specific room."""
-        return [r for r in self.readings if r.get('room') == room_name]
+        return [r for r in self.readings if r.room == room_name]
+    
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Convert logged readings back into sensor payload dicts for export."""
+        records = []
+        for sensor_type, room, value, hour in self.readings:
+            # Same key order as the payloads: unit/occupied come before hour
+            record = {'sensor_type': sensor_type, 'room': room, 'value': value}
+            if sensor_type == 'pir':
+                record['occupied'] = bool(value)
+            elif sensor_type in _UNITS:
+                record['unit'] = _UNITS[sensor_type]
+            record['hour'] = hour
+            records.append(record)
+        return records
 
 
 class SmartHomeSimulation:
@@ -50,15 +144,26 @@ class SmartHomeSimulation:
         ("Study", 28.0),
     ]
     
-    def __init__(self):
-        """Initialize the simulation with 4 rooms."""
+    def __init__(self, seed: Optional[int] = None, sample_p: float = 1.0):
+        """
+        Initialize the simulation with 4 rooms.
+        
+        Args:
+            seed: Seed for the simulation's random generator (None for a random run)
+            sample_p: Fraction of raw readings the logger keeps for export
+                      (statistics always use every reading)
+        """
         self.rooms: Dict[str, RoomSensors] = {}
-        self.logger = SimulationLogger()
+        self.logger = SimulationLogger(sample_p)
         self.simulation_data: Dict[str, Any] = {}
+        self._rng = random.Random(seed)
+        # Hours and time-of-day terms depend only on the step, so compute them once
+        self._hour_table = tuple(self._step_to_hour(step) for step in range(self.TOTAL_STEPS))
+        self.profile = DailyProfile(self._hour_table)
         
-        # Initialize rooms
+        # Initialize rooms, all drawing from the simulation's generator
         for room_name, base_temp in self.ROOMS:
-            room = RoomSensors(room_name, base_temp)
+            room = RoomSensors(room_name, base_temp, self._rng)
             room.register_observer(self.logger)
             self.rooms[room_name] = room
     
@@ -72,6 +177,12 @@ class SmartHomeSimulation:
         Returns:
             Hour of day (0.0-24.0)
         """
+        if 0 <= step < self.TOTAL_STEPS:
+            return self._hour_table[step]
+        return self._step_to_hour(step)
+    
+    def _step_to_hour(self, step: int) -> float:
+        """Compute the simulated hour for a step (see get_simulated_hour)."""
         minutes_elapsed = step * self.STEP_DURATION_MINUTES
         hour = (minutes_elapsed / 60.0) % self.TOTAL_HOURS
         return hour
@@ -98,22 +209,46 @@ class SmartHomeSimulation:
         
         # Run simulation loop
         print("Running simulation...")
-        for step in range(self.TOTAL_STEPS):
-            simulated_hour = self.get_simulated_hour(step)
-            
-            # Read all sensors for all rooms
-            for room_name, room in self.rooms.items():
-                room.read_all(simulated_hour)
-            
-            # Print progress every 24 steps (2 hours)
-            if verbose and step % 24 == 0:
-                print(f"  Step {step:3d} / {self.TOTAL_STEPS} (Hour {simulated_hour:5.1f})")
-        
+        self._simulate_all_steps(verbose)
         print(f"✓ Simulation complete. Processed {self.TOTAL_STEPS} steps.\n")
         
         # Analyze results
         return self._analyze_results()
     
+    def _simulate_all_steps(self, verbose: bool = False) -> None:
+        """
+        Generate every step's readings for every room, one step at a time.
+        Every room is read for step t, and its observers notified, before
+        step t+1, so control logic reacting to a reading (e.g. switching the
+        AC) affects the readings that follow.
+        
+        Args:
+            verbose: If True, print progress every 24 steps (written once at the end)
+        """
+        profile = self.profile
+        # Bind every sensor's read_step once, in room order (temperature, PIR, LDR)
+        readers = tuple(
+            read_step
+            for room in self.rooms.values()
+            for read_step in (room.temperature_sensor.read_step,
+                              room.pir_sensor.read_step,
+                              room.ldr_sensor.read_step)
+        )
+        progress = []
+        
+        for step, simulated_hour in enumerate(profile.hours):
+            # Read all sensors for all rooms against the shared profile;
+            # observers hear about each reading as it is taken
+            for read_step in readers:
+                read_step(profile, step)
+            
+            # Record progress every 24 steps (2 hours)
+            if verbose and step % 24 == 0:
+                progress.append(f"  Step {step:3d} / {self.TOTAL_STEPS} (Hour {simulated_hour:5.1f})\n")
+        
+        # Emit progress in a single write instead of one print per line
+        sys.stdout.writelines(progress)
+    
     def _analyze_results(self) -> Dict[str, Any]:
         """
         Analyze simulation results and generate statistics.
@@ -127,67 +262,61 @@ class SmartHomeSimulation:
                 'step_duration_minutes': self.STEP_DURATION_MINUTES,
                 'total_duration_hours': self.TOTAL_HOURS,
                 'rooms': len(self.rooms),
-                'total_readings': len(self.logger.readings)
+                'total_readings': self.logger.reading_count
             },
             'room_statistics': {}
         }
         
         # Analyze each room
         for room_name in self.rooms.keys():
-            room_readings = self.logger.get_readings_for_room(room_name)
-            stats = self._analyze_room(room_name, room_readings)
+            stats = self._analyze_room(room_name, self.logger.by_room[room_name])
             results['room_statistics'][room_name] = stats
         
         return results
     
-    def _analyze_room(self, room_name: str, readings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_room(self, room_name: str, values: Dict[str, Sequence[Any]]) -> Dict[str, Any]:
         """
         Analyze sensor data for a single room.
         
         Args:
             room_name: Name of the room
-            readings: List of sensor readings for this room
+            values: Logged values for this room, keyed by sensor type
         
         Returns:
             Dictionary with room statistics
         """
-        # Separate readings by sensor type
-        temp_readings = [r for r in readings if r['sensor_type'] == 'temperature']
-        pir_readings = [r for r in readings if r['sensor_type'] == 'pir']
-        ldr_readings = [r for r in readings if r['sensor_type'] == 'ldr']
-        
+        # PIR values are 0/1, so the occupied count is the sum of the PIR array
+        pir = values.get('pir', [])
         stats = {
-            'total_readings': len(readings),
-            'temperature': self._analyze_temperature(temp_readings),
-            'occupancy': self._analyze_occupancy(pir_readings),
-            'light': self._analyze_light(ldr_readings)
+            'total_readings': sum(len(v) for v in values.values()),
+            'temperature': self._analyze_temperature(values.get('temperature', [])),
+            'occupancy': self._analyze_occupancy(sum(pir), len(pir)),
+            'light': self._analyze_light(values.get('ldr', []))
         }
         
         return stats
     
-    def _analyze_temperature(self, readings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_temperature(self, values: Sequence[float]) -> Dict[str, Any]:
         """Analyze temperature readings."""
-        if not readings:
+        if not values:
             return {}
         
-        values = [r['value'] for r in readings]
+        # Each reduction runs once; range reuses min/max
+        low, high, count = min(values), max(values), len(values)
         return {
-            'readings': len(values),
-            'min': min(values),
-            'max': max(values),
-            'avg': round(sum(values) / len(values), 2),
-            'range': round(max(values) - min(values), 2)
+            'readings': count,
+            'min': low,
+            'max': high,
+            'avg': round(sum(values) / count, 2),
+            'range': round(high - low, 2)
         }
     
-    def _analyze_occupancy(self, readings: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze occupancy readings."""
-        if not readings:
+    def _analyze_occupancy(self, occupied_count: int, total_count: int) -> Dict[str, Any]:
+        """Analyze occupancy readings from their occupied and total counts."""
+        if not total_count:
             return {}
         
-        values = [r['value'] for r in readings]
-        occupied_count = sum(values)
-        total_count = len(values)
-        occupancy_rate = occupied_count / total_count if total_count > 0 else 0
+        occupancy_rate = occupied_count / total_count
         
         return {
             'readings': total_count,
@@ -196,18 +325,19 @@ class SmartHomeSimulation:
             'occupancy_rate': round(occupancy_rate, 3)
         }
     
-    def _analyze_light(self, readings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_light(self, values: Sequence[int]) -> Dict[str, Any]:
         """Analyze light level readings."""
-        if not readings:
+        if not values:
             return {}
         
-        values = [r['value'] for r in readings]
+        # Each reduction runs once; range reuses min/max
+        low, high, count = min(values), max(values), len(values)
         return {
-            'readings': len(values),
-            'min': min(values),
-            'max': max(values),
-            'avg': round(sum(values) / len(values), 1),
-            'range': max(values) - min(values)
+            'readings': count,
+            'min': low,
+            'max': high,
+            'avg': round(sum(values) / count, 1),
+            'range': high - low
         }
     
     def print_summary(self, results: Dict[str, Any]) -> None:
@@ -272,12 +402,16 @@ class SmartHomeSimulation:
                 print(f"    Avg: {light['avg']:.0f}")
                 print(f"    Range: {light['range']}")
     
-    def export_raw_data(self, filename: str = "simulation_data.json") -> None:
+    def export_raw_data(self, filename: str = "simulation_data.json", pretty: bool = False) -> None:
         """
         Export all raw sensor readings to a JSON file.
+        Uses orjson when it is installed, otherwise the standard json module.
+        With sample_p < 1 the exported readings are a representative
+        subsample; total_readings still counts every reading taken.
         
         Args:
             filename: Output filename
+            pretty: If True, indent the output by 2 spaces; otherwise write compact JSON
         """
         data = {
             'metadata': {
@@ -285,13 +419,22 @@ class SmartHomeSimulation:
                 'step_duration_minutes': self.STEP_DURATION_MINUTES,
                 'total_duration_hours': self.TOTAL_HOURS,
                 'rooms': list(self.rooms.keys()),
-                'total_readings': len(self.logger.readings)
+                'total_readings': self.logger.reading_count,
+                'sample_p': self.logger.sample_p
             },
-            'readings': self.logger.readings
+            'readings': self.logger.to_records()
         }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Serialize in one go and hand the file a single large write
+        if orjson is not None:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+        elif pretty:
+            payload = json.dumps(data, indent=2).encode('utf-8')
+        else:
+            payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        
+        with open(filename, 'wb') as f:
+            f.write(payload)
         
         print(f"✓ Raw data exported to {filename}")
 
@@ -3,104 +3,146 @@ Test suite for sensors.py
 Verifies sensor behavior at different times of day and observer notifications
 """
 
+import io
+import os
+import random
+import sys
+from array import array
+import pytest
 from sensors import (
     SensorObserver, RoomSensors, TemperatureSensor, 
-    PIRSensor, LDRSensor
+    PIRSensor, LDRSensor, DailyProfile
 )
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+# Per-reading diagnostics are buffered and written once at the end of each test;
+# set SENSOR_TEST_VERBOSE=1 to collect them at all (call sites check VERBOSE
+# first, so nothing is even formatted otherwise).
+VERBOSE = bool(os.environ.get('SENSOR_TEST_VERBOSE'))
+_LOG = io.StringIO()
+
+# Hours sampled by each test, as floats up front so loops pass them straight through
+_PIR_HOURS = (2.0, 6.0, 12.0, 18.0, 22.0)
+_ROOM_HOURS = (0.0, 6.0, 12.0, 18.0, 23.0)
+_DAY_HOURS = tuple(float(h) for h in range(24))
+
+
+def _log(msg: str) -> None:
+    """Buffer one diagnostic line."""
+    _LOG.write(msg)
+    _LOG.write('\n')
+
+
+def _flush_log() -> None:
+    """Write the buffered diagnostics to stdout in one call."""
+    sys.stdout.write(_LOG.getvalue())
+    _LOG.seek(0)
+    _LOG.truncate()
+
+
+@pytest.fixture(autouse=True)
+def _flush_log_after_test():
+    """Under pytest, write each test's buffered diagnostics once it finishes."""
+    yield
+    _flush_log()
 
 
 class TestObserver(SensorObserver):
-    """Test observer that logs sensor readings."""
+    """Test observer that records sensor readings, logging them only when verbose."""
+    
+    __slots__ = ('name', 'readings', 'verbose')
     
-    def __init__(self, name: str = "TestObserver"):
+    def __init__(self, name: str = "TestObserver", verbose: bool = VERBOSE):
         self.name = name
         self.readings = []
+        self.verbose = verbose
     
     def update(self, sensor_data: Dict[str, Any]) -> None:
-        """Log sensor data when notified."""
+        """Record sensor data when notified."""
         self.readings.append(sensor_data)
-        print(f"  [{self.name}] {sensor_data['sensor_type'].upper()}: {sensor_data}")
+        if self.verbose:
+            _log(f"  [{self.name}] {sensor_data['sensor_type'].upper()}: {sensor_data}")
 
 
-def test_temperature_sensor():
-    """Test temperature sensor at different times of day."""
+def test_temperature_sensor(daily_readings: Dict[str, Any]):
+    """Test temperature sensor across every hour of the day."""
     print("\n=== TEMPERATURE SENSOR TESTS ===")
     
-    sensor = TemperatureSensor(base_temp=20.0, room_name="TestRoom")
-    observer = TestObserver("TempObserver")
-    sensor.register_observer(observer)
-    
-    test_hours = [0, 6, 12, 14, 18, 23]
-    print("\nTesting temperature readings at different hours:")
-    
-    for hour in test_hours:
-        temp = sensor.read(float(hour))
-        print(f"Hour {hour:2d}: {temp}°C")
+    values: List[float] = daily_readings['temperature']
+    if VERBOSE:
+        for hour, temp in zip(daily_readings['hours'], values):
+            _log(f"Hour {hour:2.0f}: {temp}°C")
     
     # Verify readings are in valid range
-    for reading in observer.readings:
-        assert 15 <= reading['value'] <= 45, f"Temperature out of range: {reading['value']}"
+    assert len(values) == 24, f"Expected 24 temperature readings, got {len(values)}"
+    assert 15 <= min(values) and max(values) <= 45, \
+        f"Temperature out of range: {min(values)}-{max(values)}"
     
-    print(f"✓ All {len(observer.readings)} temperature readings in valid range (15-45°C)")
+    print(f"✓ All {len(values)} temperature readings in valid range (15-45°C)")
 
 
-def test_pir_sensor():
-    """Test PIR sensor at different times of day."""
+def test_pir_sensor(daily_readings: Dict[str, Any]):
+    """Test PIR sensor values across the day and its hold period."""
     print("\n=== PIR SENSOR TESTS ===")
     
+    # Verify readings are 0 or 1
+    values: List[int] = daily_readings['occupancy']
+    invalid = set(values) - {0, 1}
+    assert not invalid, f"Invalid occupancy values: {invalid}"
+    print(f"✓ All {len(values)} PIR readings are valid (0 or 1)")
+    
     sensor = PIRSensor(room_name="TestRoom")
-    observer = TestObserver("PIRObserver")
-    sensor.register_observer(observer)
     
-    test_hours = [2, 6, 12, 18, 22]
+    test_hours = _PIR_HOURS
     print("\nTesting occupancy at different hours (10 readings per hour):")
     
-    occupancy_by_hour = {}
-    for hour in test_hours:
-        occupancy_by_hour[hour] = []
-        for i in range(10):
-            occupancy = sensor.read(float(hour))
-            occupancy_by_hour[hour].append(occupancy)
+    reads_per_hour = 10
+    buf = array('b', bytes(reads_per_hour * len(test_hours)))
+    for h, hour in enumerate(test_hours):
+        start = h * reads_per_hour
+        for i in range(start, start + reads_per_hour):
+            buf[i] = sensor.read(hour)
         
-        avg_occupancy = sum(occupancy_by_hour[hour]) / len(occupancy_by_hour[hour])
-        print(f"Hour {hour:2d} (avg occupancy: {avg_occupancy:.1%}): {occupancy_by_hour[hour]}")
-    
-    # Verify readings are 0 or 1
-    for reading in observer.readings:
-        assert reading['value'] in [0, 1], f"Invalid occupancy value: {reading['value']}"
-    
-    print(f"✓ All {len(observer.readings)} PIR readings are valid (0 or 1)")
+        if VERBOSE:
+            hour_buf = buf[start:start + reads_per_hour]
+            avg_occupancy = sum(hour_buf) / reads_per_hour
+            _log(f"Hour {hour:2.0f} (avg occupancy: {avg_occupancy:.1%}): {hour_buf.tolist()}")
+    
+    # Once occupied, the room holds for at least 3 readings (re-evaluated after 2-8
+    # more); only a run cut off by the end of the buffer may be shorter
+    runs = [len(run) for run in bytes(buf).split(b'\x00') if run]
+    if buf[-1]:
+        runs.pop()
+    assert all(run >= 3 for run in runs), f"Occupied run shorter than hold period: {runs}"
+    
+    print(f"✓ {len(runs)} occupied runs all held for at least 3 readings")
 
 
-def test_ldr_sensor():
-    """Test LDR sensor at different times of day."""
+def test_ldr_sensor(daily_readings: Dict[str, Any]):
+    """Test LDR sensor across every hour of the day."""
     print("\n=== LDR SENSOR TESTS ===")
     
-    sensor = LDRSensor(room_name="TestRoom")
-    observer = TestObserver("LDRObserver")
-    sensor.register_observer(observer)
-    
-    test_hours = [0, 3, 6, 9, 12, 15, 18, 21, 23]
-    print("\nTesting light levels at different hours:")
-    
-    for hour in test_hours:
-        brightness = sensor.read(float(hour))
-        day_phase = "NIGHT" if (hour < 6 or hour > 18) else "DAY"
-        print(f"Hour {hour:2d} ({day_phase:5s}): {brightness:4d}")
+    hours = daily_readings['hours']
+    values: List[int] = daily_readings['light_level']
+    if VERBOSE:
+        for hour, brightness in zip(hours, values):
+            day_phase = "NIGHT" if (hour < 6 or hour > 18) else "DAY"
+            _log(f"Hour {hour:2.0f} ({day_phase:5s}): {brightness:4d}")
     
     # Verify readings are in valid range
-    for reading in observer.readings:
-        assert 0 <= reading['value'] <= 1023, f"Light level out of range: {reading['value']}"
+    assert len(values) == 24, f"Expected 24 light readings, got {len(values)}"
+    assert 0 <= min(values) and max(values) <= 1023, \
+        f"Light level out of range: {min(values)}-{max(values)}"
     
     # Verify night readings are low and day readings are higher
-    night_readings = [r['value'] for r in observer.readings if r['hour'] < 6 or r['hour'] > 18]
-    day_readings = [r['value'] for r in observer.readings if 6 <= r['hour'] <= 18]
+    night_readings, day_readings = [], []
+    for hour, value in zip(hours, values):
+        (day_readings if 6 <= hour <= 18 else night_readings).append(value)
     
     avg_night = sum(night_readings) / len(night_readings) if night_readings else 0
     avg_day = sum(day_readings) / len(day_readings) if day_readings else 0
     
-    print(f"✓ All {len(observer.readings)} LDR readings in valid range (0-1023)")
+    print(f"✓ All {len(values)} LDR readings in valid range (0-1023)")
     print(f"  Average night brightness: {avg_night:.0f}")
     print(f"  Average day brightness: {avg_day:.0f}")
     assert avg_day > avg_night, "Day brightness should be higher than night"
@@ -116,13 +158,14 @@ def test_room_sensors():
     
     print("\nReading all sensors for Living Room at different times:")
     
-    test_hours = [0, 6, 12, 18, 23]
+    test_hours = _ROOM_HOURS
     for hour in test_hours:
-        readings = room.read_all(float(hour))
-        print(f"\nHour {hour:2d}:")
-        print(f"  Temperature: {readings['temperature']}°C")
-        print(f"  Occupancy: {readings['occupancy']} (occupied={readings['occupancy']==1})")
-        print(f"  Light Level: {readings['light_level']}")
+        readings = room.read_all(hour)
+        if VERBOSE:
+            _log(f"\nHour {hour:2.0f}:")
+            _log(f"  Temperature: {readings['temperature']}°C")
+            _log(f"  Occupancy: {readings['occupancy']} (occupied={readings['occupancy']==1})")
+            _log(f"  Light Level: {readings['light_level']}")
     
     print(f"\n✓ RoomSensors.read_all() returned {len(observer.readings)} total readings")
     print(f"  (3 readings per hour × {len(test_hours)} hours)")
@@ -133,11 +176,12 @@ def test_observer_notifications():
     print("\n=== OBSERVER NOTIFICATION TESTS ===")
     
     sensor = TemperatureSensor(base_temp=20.0, room_name="NotificationTest")
-    observer1 = TestObserver("Observer1")
-    observer2 = TestObserver("Observer2")
+    observer1 = TestObserver("Observer1", verbose=False)
+    observer2 = TestObserver("Observer2", verbose=False)
     
     sensor.register_observer(observer1)
     sensor.register_observer(observer2)
+    sensor.register_observer(observer1)  # duplicate registration is ignored
     
     print("\nRegistering 2 observers and reading sensor 3 times:")
     for i in range(3):
@@ -145,6 +189,8 @@ def test_observer_notifications():
     
     assert len(observer1.readings) == 3, f"Observer1 should have 3 readings, got {len(observer1.readings)}"
     assert len(observer2.readings) == 3, f"Observer2 should have 3 readings, got {len(observer2.readings)}"
+    assert observer1.readings[0] == observer2.readings[0]
+    assert observer1.readings[0] is not observer2.readings[0], "Observers must not share payload dicts"
     
     print(f"✓ Observer1 received {len(observer1.readings)} notifications")
     print(f"✓ Observer2 received {len(observer2.readings)} notifications")
@@ -161,6 +207,91 @@ def test_observer_notifications():
     print(f"  Observer2 now has {len(observer2.readings)} readings (got new one)")
 
 
+def test_ac_cooling():
+    """Test that the AC cooling offset builds up and carries across reads."""
+    print("\n=== AC COOLING TESTS ===")
+    
+    sensor = TemperatureSensor(base_temp=30.0, room_name="ACTest")
+    sensor.set_ac_state(True)
+    sensor.read_series(DailyProfile([14.0] * 10))
+    assert abs(sensor._ac_cooling_offset - 3.0) < 1e-9, \
+        f"Expected 3.0°C of cooling after 10 readings, got {sensor._ac_cooling_offset}"
+    
+    sensor.read_series(DailyProfile([14.0] * 20))
+    assert sensor._ac_cooling_offset == sensor._ac_max_cooling, "Cooling should cap at the maximum"
+    
+    sensor.set_ac_state(False)
+    sensor.read(14.0)
+    assert abs(sensor._ac_cooling_offset - 5.8) < 1e-9, "Cooling should recover once AC is off"
+    
+    print(f"✓ AC cooling offset builds, caps at {sensor._ac_max_cooling}°C and recovers")
+
+
+def test_daily_profile():
+    """Test the precomputed time-of-day tables."""
+    print("\n=== DAILY PROFILE TESTS ===")
+    
+    hours = [0.0, 5.9, 6.0, 12.0, 16.9, 17.0, 18.0, 21.9, 22.0, 23.9]
+    profile = DailyProfile(hours)
+    
+    assert len(profile) == len(hours)
+    assert profile.occupancy_probability == (0.10, 0.10, 0.20, 0.20, 0.20, 0.80, 0.80, 0.80, 0.10, 0.10), \
+        f"Unexpected occupancy schedule: {profile.occupancy_probability}"
+    assert profile.is_daylight == (False, False, True, True, True, True, True, False, False, False), \
+        f"Unexpected daylight window: {profile.is_daylight}"
+    assert abs(profile.daylight_wave[3] - 1.0) < 1e-9, "Daylight curve should peak at noon"
+    
+    print(f"✓ Profile tables match the occupancy schedule and daylight window")
+
+
+def test_batch_notifications():
+    """Test that read_series() delivers one batch per observer."""
+    print("\n=== BATCH NOTIFICATION TESTS ===")
+    
+    class BatchObserver(TestObserver):
+        def __init__(self, name: str = "BatchObserver"):
+            super().__init__(name)
+            self.batches = 0
+        
+        def update_batch(self, batch) -> None:
+            self.batches += 1
+            super().update_batch(batch)
+    
+    sensor = LDRSensor(room_name="BatchTest")
+    observer = BatchObserver()
+    sensor.register_observer(observer)
+    
+    hours = _DAY_HOURS
+    levels = sensor.read_series(DailyProfile(hours))
+    
+    assert observer.batches == 1, f"Expected 1 batch, got {observer.batches}"
+    assert len(observer.readings) == len(hours), \
+        f"Expected {len(hours)} readings, got {len(observer.readings)}"
+    assert [r['value'] for r in observer.readings] == levels, "Batch order should match the returned series"
+    assert tuple(r['hour'] for r in observer.readings) == hours
+    
+    print(f"✓ Observer received {len(observer.readings)} readings in {observer.batches} batch")
+
+
+def test_read_and_read_step_match_series():
+    """Test that single reads and stepping through a profile reproduce read_series() exactly."""
+    print("\n=== READ STEP TESTS ===")
+    
+    profile = DailyProfile(_DAY_HOURS)
+    for make_sensor in (lambda rng: TemperatureSensor(20.0, "StepTest", rng),
+                        lambda rng: PIRSensor("StepTest", rng),
+                        lambda rng: LDRSensor("StepTest", rng)):
+        series = make_sensor(random.Random(419)).read_series(profile)
+        stepper = make_sensor(random.Random(419))
+        steps = [stepper.read_step(profile, i) for i in range(len(profile))]
+        assert steps == series, f"{type(stepper).__name__}: read_step diverged from read_series"
+        reader = make_sensor(random.Random(419))
+        singles = [reader.read(hour) for hour in _DAY_HOURS]
+        assert singles == series, f"{type(reader).__name__}: read diverged from read_series"
+    
+    print(f"✓ read() and read_step() match read_series() for all three sensors")
+
+
 def run_all_tests():
     """Run all sensor tests."""
     print("=" * 60)
@@ -168,11 +299,18 @@ def run_all_tests():
     print("=" * 60)
     
     try:
-        test_temperature_sensor()
-        test_pir_sensor()
-        test_ldr_sensor()
+        room = RoomSensors("FixtureRoom", base_temp=20.0)
+        daily_readings = room.read_series(DailyProfile(_DAY_HOURS))
+        test_temperature_sensor(daily_readings)
+        test_pir_sensor(daily_readings)
+        test_ldr_sensor(daily_readings)
         test_room_sensors()
         test_observer_notifications()
+        test_ac_cooling()
+        test_daily_profile()
+        test_batch_notifications()
+        test_read_and_read_step_match_series()
+        _flush_log()
         
         print("\n" + "=" * 60)
         print("✓ ALL TESTS PASSED")
@@ -180,9 +318,11 @@ def run_all_tests():
         return True
     
     except AssertionError as e:
+        _flush_log()
         print(f"\n✗ TEST FAILED: {e}")
         return False
     except Exception as e:
+        _flush_log()
         print(f"\n✗ UNEXPECTED ERROR: {e}")
         import traceback
         traceback.print_exc()